@@ -0,0 +1,67 @@
+import sys
+
+import jax.numpy as jnp
+
+from pytensor.link.jax.dispatch.basic import jax_funcify
+
+
+def _jax_diagonal_subtensor(x, i0, i1):
+    """Gather the values of `get_diagonal_subtensor_view` in JAX."""
+    Tf = x.shape[i1]
+    n_out = x.shape[i0] - Tf + 1
+    if n_out < 1:
+        raise ValueError("diagonal is longer than axis i0 (plus padding)")
+    a = jnp.arange(n_out)[:, None]
+    t = jnp.arange(Tf)[None, :]
+    x = jnp.moveaxis(x, (i0, i1), (0, 1))
+    return jnp.moveaxis(x[a + Tf - 1 - t, t], (0, 1), (i0, i1))
+
+
+def jax_funcify_DiagonalSubtensor(op, node, **kwargs):
+    from pytensor.tensor.nnet.conv3d2d import _constant_axes
+
+    axes = _constant_axes(node)
+    if axes is None:
+        raise NotImplementedError(
+            "JAX only supports DiagonalSubtensor with constant axes"
+        )
+    i0, i1 = axes
+
+    def diagonal_subtensor(x, *axes):
+        return _jax_diagonal_subtensor(x, i0, i1)
+
+    return diagonal_subtensor
+
+
+def jax_funcify_DiagonalSubtensorSum(op, node, **kwargs):
+    i0, i1, t_pad = op.i0, op.i1, op.t_pad
+    acc_dtype = op.acc_dtype or node.inputs[0].dtype
+    out_dtype = node.outputs[0].dtype
+    pad_width = [(0, 0)] * node.inputs[0].ndim
+    pad_width[i0] = (t_pad, t_pad)
+
+    def diagonal_subtensor_sum(x):
+        if t_pad:
+            x = jnp.pad(x, pad_width)
+        diag = _jax_diagonal_subtensor(x, i0, i1)
+        return diag.sum(axis=i1, dtype=acc_dtype).astype(out_dtype)
+
+    return diagonal_subtensor_sum
+
+
+def register_conv3d2d():
+    """Register the implementations of the `conv3d2d` Ops.
+
+    Importing `pytensor.tensor.nnet` registers rewrites and raises a
+    deprecation warning, so this is only called once that module has been
+    imported, either below or at the end of `conv3d2d`.
+
+    """
+    from pytensor.tensor.nnet.conv3d2d import DiagonalSubtensor, DiagonalSubtensorSum
+
+    jax_funcify.register(DiagonalSubtensor, jax_funcify_DiagonalSubtensor)
+    jax_funcify.register(DiagonalSubtensorSum, jax_funcify_DiagonalSubtensorSum)
+
+
+if "pytensor.tensor.nnet.conv3d2d" in sys.modules:
+    register_conv3d2d()
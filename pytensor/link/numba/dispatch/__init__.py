@@ -9,5 +9,6 @@ import pytensor.link.numba.dispatch.nlinalg
 import pytensor.link.numba.dispatch.random
 import pytensor.link.numba.dispatch.elemwise
 import pytensor.link.numba.dispatch.scan
+import pytensor.link.numba.dispatch.nnet
 
 # isort: on
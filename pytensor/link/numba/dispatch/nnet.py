@@ -0,0 +1,100 @@
+import sys
+
+import numba.np.unsafe.ndarray as numba_ndarray
+import numpy as np
+
+from pytensor.link.numba.dispatch import basic as numba_basic
+from pytensor.link.numba.dispatch.basic import numba_funcify
+from pytensor.link.utils import compile_function_src
+
+
+def numba_funcify_DiagonalSubtensor(op, node, **kwargs):
+    from pytensor.tensor.nnet.conv3d2d import _constant_axes
+
+    axes = _constant_axes(node)
+    if axes is None:
+        return numba_funcify.dispatch(object)(op, node, **kwargs)
+    i0, i1 = axes
+    # Build the diagonal view with `as_strided`, like
+    # `get_diagonal_subtensor_view` does by setting the strides.
+    idx = ", ".join([":"] * i0 + [f"x.shape[{i1}] - 1 :"])
+    copy = ".copy()" if op.strict else ""
+    args = ", ".join(["x", "i0", "i1"][: len(node.inputs)])
+    src = f"""
+def diagonal_subtensor({args}):
+    if x.shape[{i0}] < x.shape[{i1}]:
+        raise ValueError("diagonal is longer than axis i0")
+    xview = x[{idx}]
+    strides = tuple_setitem(
+        xview.strides, {i1}, xview.strides[{i1}] - xview.strides[{i0}]
+    )
+    return as_strided(xview, shape=xview.shape, strides=strides){copy}
+"""
+    diagonal_subtensor = compile_function_src(
+        src,
+        "diagonal_subtensor",
+        {
+            "as_strided": np.lib.stride_tricks.as_strided,
+            "tuple_setitem": numba_basic.tuple_setitem,
+        },
+    )
+    return numba_basic.numba_njit(diagonal_subtensor)
+
+
+def numba_funcify_DiagonalSubtensorSum(op, node, **kwargs):
+    i0, i1, t_pad = op.i0, op.i1, op.t_pad
+    if i0 > i1 or node.inputs[0].dtype not in ("float32", "float64"):
+        return numba_funcify.dispatch(object)(op, node, **kwargs)
+    out_ndim = node.outputs[0].ndim
+    acc_dtype = np.dtype(op.acc_dtype or node.inputs[0].dtype).type
+    out_dtype = np.dtype(node.outputs[0].dtype).type
+
+    @numba_basic.numba_njit
+    def diagonal_subtensor_sum(x):
+        shape = np.array(x.shape)
+        Tf = shape[i1]
+        n_out = shape[i0] + 2 * t_pad - Tf + 1
+        if n_out < 1:
+            raise ValueError("diagonal is longer than axis i0 (plus padding)")
+        P = np.prod(shape[:i0])
+        Q = np.prod(shape[i0 + 1 : i1])
+        R = np.prod(shape[i1 + 1 :])
+        x5 = np.ascontiguousarray(x).reshape((P, shape[i0], Q, Tf, R))
+        out = np.zeros((P, n_out, Q, R), dtype=acc_dtype)
+        # out[p, a, q, r] = sum_t x5[p, a + Tf - 1 - t - t_pad, q, t, r], with
+        # out of range indices on the second axis of `x5` treated as zeros.
+        # This is a serial loop: a cached `parallel=True` kernel called from
+        # this (also cached) function crashes when it is loaded from the cache.
+        for p in range(P):
+            for a in range(n_out):
+                for q in range(Q):
+                    for t in range(Tf):
+                        ts = a + Tf - 1 - t - t_pad
+                        if ts < 0 or ts >= shape[i0]:
+                            continue
+                        for r in range(R):
+                            out[p, a, q, r] += x5[p, ts, q, t, r]
+        out_shape = np.concatenate((shape[:i1], shape[i1 + 1 :]))
+        out_shape[i0] = n_out
+        out = out.astype(out_dtype)
+        return out.reshape(numba_ndarray.to_fixed_tuple(out_shape, out_ndim))
+
+    return diagonal_subtensor_sum
+
+
+def register_conv3d2d():
+    """Register the implementations of the `conv3d2d` Ops.
+
+    Importing `pytensor.tensor.nnet` registers rewrites and raises a
+    deprecation warning, so this is only called once that module has been
+    imported, either below or at the end of `conv3d2d`.
+
+    """
+    from pytensor.tensor.nnet.conv3d2d import DiagonalSubtensor, DiagonalSubtensorSum
+
+    numba_funcify.register(DiagonalSubtensor, numba_funcify_DiagonalSubtensor)
+    numba_funcify.register(DiagonalSubtensorSum, numba_funcify_DiagonalSubtensorSum)
+
+
+if "pytensor.tensor.nnet.conv3d2d" in sys.modules:
+    register_conv3d2d()
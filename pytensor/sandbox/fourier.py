@@ -5,6 +5,8 @@ Provides Ops for FFT and DCT.
 
 
 # This module will soon be deprecated.
+import functools
+import os
 import warnings
 
 import numpy as np
@@ -17,11 +19,28 @@ from pytensor.tensor.basic import as_tensor
 from pytensor.tensor.type import zmatrix
 
 
+try:
+    import scipy.fft as scipy_fft
+except ImportError:
+    # `scipy.fft` is only available for SciPy >= 1.4.
+    scipy_fft = None
+
+try:
+    import pyfftw.interfaces.cache
+    import pyfftw.interfaces.numpy_fft as pyfftw_fft
+
+    # Keep the FFTW plans alive between calls so that repeated transforms of
+    # the same shape skip the planning step.
+    pyfftw.interfaces.cache.enable()
+    pyfftw.interfaces.cache.set_keepalive_time(60)
+except ImportError:
+    pyfftw_fft = None
+
+
 message = (
     "The module pytensor.sandbox.fourier will soon be deprecated."
     " Please use pytensor.tensor.fft, which supports gradients."
 )
-warnings.warn(message)
 
 
 class GradTodo(Op):
@@ -89,26 +108,49 @@ class FFT(Op):
     def perform(self, node, inp, out):
         frames, n, axis = inp
         spectrogram, buf = out
-        if self.inverse:
-            fft_fn = numpy.fft.ifft
+        n = int(n)
+        axis = int(axis)
+        if self.half:
+            if axis not in (0, 1):
+                raise NotImplementedError()
+            if n % 2:
+                raise ValueError("halfFFT on odd-length vectors is undefined")
+            # The input is real, so only compute the non-negative frequencies.
+            if self.inverse:
+                fft_name = "ihfft"
+            else:
+                fft_name = "rfft"
         else:
-            fft_fn = numpy.fft.fft
+            if self.inverse:
+                fft_name = "ifft"
+            else:
+                fft_name = "fft"
+
+        # Compute in double precision, as the output is always complex128.
+        frames = np.asarray(frames, dtype=np.result_type(frames.dtype, np.float64))
+        if pyfftw_fft is not None:
+            # Cached FFTW plans are keyed on the input strides, so always
+            # pass a C-contiguous array.
+            fft = getattr(pyfftw_fft, fft_name)(
+                np.ascontiguousarray(frames),
+                n=n,
+                axis=axis,
+                threads=os.cpu_count() or 1,
+                planner_effort="FFTW_MEASURE",
+            )
+        elif scipy_fft is not None:
+            # SciPy's pocketfft can split the transform over all the cores.
+            fft = getattr(scipy_fft, fft_name)(frames, n=n, axis=axis, workers=-1)
+        else:
+            fft = getattr(numpy.fft, fft_name)(frames, n, axis)
 
-        fft = fft_fn(frames, int(n), int(axis))
         if self.half:
-            M, N = fft.shape
+            # Drop the Nyquist component returned by rfft/ihfft.
             if axis == 0:
-                if M % 2:
-                    raise ValueError("halfFFT on odd-length vectors is undefined")
-                spectrogram[0] = fft[0 : M / 2, :]
-            elif axis == 1:
-                if N % 2:
-                    raise ValueError("halfFFT on odd-length vectors is undefined")
-                spectrogram[0] = fft[:, 0 : N / 2]
+                fft = fft[0 : n // 2, :]
             else:
-                raise NotImplementedError()
-        else:
-            spectrogram[0] = fft
+                fft = fft[:, 0 : n // 2]
+        spectrogram[0] = fft
 
     def grad(self, inp, out):
         frames, n, axis = inp
@@ -130,12 +172,51 @@ def dct_matrix(rows, cols, unitary=True):
     This algorithm is adapted from Dan Ellis' Rastmat spec2cep.m, lines 15-20.
 
     """
-    rval = np.zeros((rows, cols))
-    col_range = np.arange(cols)
+    return _dct_matrix(rows, cols, unitary).copy()
+
+
+@functools.lru_cache(maxsize=32)
+def _dct_matrix(rows, cols, unitary):
+    """
+    Cached implementation of `dct_matrix`.
+
+    The returned matrix is shared between callers, so it is read-only.
+
+    """
+    row_range = np.arange(rows)[:, None]
+    col_range = np.arange(cols)[None, :]
+    freq = np.pi / (2.0 * cols)
     scale = np.sqrt(2.0 / cols)
-    for i in range(rows):
-        rval[i] = np.cos(i * (col_range * 2 + 1) / (2.0 * cols) * np.pi) * scale
+    rval = np.cos(row_range * (col_range * 2 + 1) * freq) * scale
 
     if unitary:
         rval[0] *= np.sqrt(0.5)
+    rval.flags.writeable = False
     return rval
+
+
+DEPRECATED_NAMES = [
+    ("FFT", message, FFT),
+    ("fft", message, fft),
+    ("half_fft", message, half_fft),
+    ("ifft", message, ifft),
+    ("half_ifft", message, half_ifft),
+    ("dct_matrix", message, dct_matrix),
+]
+# Only reachable through `__getattr__`, so that the deprecation warning is
+# raised when they are used rather than when the module is imported.
+del FFT, fft, half_fft, ifft, half_ifft, dct_matrix
+
+
+def __getattr__(name):
+    """Intercept module-level attribute access of deprecated symbols.
+
+    Adapted from https://stackoverflow.com/a/55139609/3006474.
+
+    """
+    for old_name, msg, old_object in DEPRECATED_NAMES:
+        if name == old_name:
+            warnings.warn(msg, DeprecationWarning, stacklevel=2)
+            return old_object
+
+    raise AttributeError(f"module {__name__} has no attribute {name}")
@@ -1,3 +1,8 @@
+import functools
+import sys
+
+import numpy as np
+
 import pytensor
 from pytensor import tensor as at
 from pytensor.gradient import DisconnectedType
@@ -8,6 +13,23 @@ from pytensor.graph.rewriting.basic import (
     copy_stack_trace,
     node_rewriter,
 )
+from pytensor.tensor.basic import Join, get_scalar_constant_value
+from pytensor.tensor.exceptions import NotScalarConstantError
+from pytensor.tensor.math import Sum
+from pytensor.tensor.rewriting.basic import register_specialize
+from pytensor.tensor.subtensor import (
+    IncSubtensor,
+    as_index_literal,
+    indices_from_subtensor,
+)
+
+
+@functools.lru_cache(maxsize=128)
+def _diagonal_subtensor_idx(ndim, i0, start):
+    """Return the index tuple selecting ``x[..., start:, ...]`` on axis `i0`."""
+    idx = [slice(None)] * ndim
+    idx[i0] = slice(start, None, None)
+    return tuple(idx)
 
 
 def get_diagonal_subtensor_view(x, i0, i1):
@@ -21,17 +43,20 @@ def get_diagonal_subtensor_view(x, i0, i1):
     """
     # We have to cast i0 and i0 to int because python
     # do not support indexing with 0-dim, 'int*' ndarrays.
-    i0 = int(i0)
-    i1 = int(i1)
+    return _diagonal_subtensor_view(x, int(i0), int(i1))
+
+
+def _diagonal_subtensor_view(x, i0, i1):
+    """`get_diagonal_subtensor_view` for Python int axes."""
     if x.shape[i0] < x.shape[i1]:
         raise NotImplementedError("is this allowed?")
-    idx = [slice(None)] * x.ndim
-    idx[i0] = slice(x.shape[i1] - 1, None, None)
-    xview = x.__getitem__(tuple(idx))
+    xview = x[_diagonal_subtensor_idx(x.ndim, i0, x.shape[i1] - 1)]
+    if x.shape[i1] == 1:
+        # The stripe is a single column, the slice is already the diagonal.
+        return xview
     strides = list(xview.strides)
-    if x.shape[i1] != 1:
-        strides[i1] -= strides[i0]
-        xview.strides = strides
+    strides[i1] -= strides[i0]
+    xview.strides = strides
     return xview
 
 
@@ -47,6 +72,8 @@ class DiagonalSubtensor(Op):
         Axis index in x
     i1
         Axis index in x
+    strict
+        If True, the output is a copy rather than a view of ``x``.
 
 
     Extended summary
@@ -91,16 +118,22 @@ class DiagonalSubtensor(Op):
 
     """
 
-    __props__ = ("inplace",)
+    __props__ = ("inplace", "strict")
 
     def __str__(self):
         if self.inplace:
             return "%s{inplace}" % self.__class__.__name__
+        if self.strict:
+            return "%s{strict}" % self.__class__.__name__
         return f"{self.__class__.__name__}"
 
-    def __init__(self, inplace=False):
+    def __init__(self, inplace=False, strict=False):
         self.inplace = inplace
-        if inplace:
+        self.strict = strict
+        # The output is a strided view of `x`. Declaring it in the
+        # `view_map` lets the destroy handler protect it against
+        # destructive consumers, so the copy is only made if `strict`.
+        if inplace or not strict:
             self.view_map = {0: [0]}
 
     def make_node(self, x, i0, i1):
@@ -113,7 +146,7 @@ class DiagonalSubtensor(Op):
 
     def perform(self, node, inputs, output_storage):
         xview = get_diagonal_subtensor_view(*inputs)
-        if self.inplace:
+        if self.inplace or not self.strict:
             output_storage[0][0] = xview
         else:
             output_storage[0][0] = xview.copy()
@@ -131,6 +164,52 @@ class DiagonalSubtensor(Op):
 diagonal_subtensor = DiagonalSubtensor(False)
 
 
+class DiagonalSubtensorConst(DiagonalSubtensor):
+    """
+    `DiagonalSubtensor` with the axes ``i0`` and ``i1`` fixed in the Op.
+
+    It is introduced by `local_specialize_DiagonalSubtensor` when the axes
+    are constants, so that `perform` does not convert them on every call.
+
+    Parameters
+    ----------
+    i0
+        Non-negative axis index in x
+    i1
+        Non-negative axis index in x
+
+    """
+
+    __props__ = ("i0", "i1", "inplace", "strict")
+
+    def __init__(self, i0, i1, inplace=False, strict=False):
+        super().__init__(inplace=inplace, strict=strict)
+        self.i0 = i0
+        self.i1 = i1
+
+    def make_node(self, x):
+        x = at.as_tensor_variable(x)
+        if max(self.i0, self.i1) >= x.type.ndim:
+            raise ValueError("axis out of range", (self.i0, self.i1), x.type.ndim)
+        type_shape = (1 if shape == 1 else None for shape in x.type.shape)
+        out_type = at.TensorType(x.type.dtype, shape=type_shape)
+        return Apply(self, [x], [out_type()])
+
+    def perform(self, node, inputs, output_storage):
+        xview = _diagonal_subtensor_view(inputs[0], self.i0, self.i1)
+        if self.inplace or not self.strict:
+            output_storage[0][0] = xview
+        else:
+            output_storage[0][0] = xview.copy()
+
+    def grad(self, inputs, g_outputs):
+        z = at.zeros_like(inputs[0])
+        return [inc_diagonal_subtensor(z, self.i0, self.i1, g_outputs[0])]
+
+    def connection_pattern(self, node):
+        return [[True]]
+
+
 class IncDiagonalSubtensor(Op):
     """
     The gradient of DiagonalSubtensor.
@@ -156,11 +235,30 @@ class IncDiagonalSubtensor(Op):
 
     def perform(self, node, inputs, output_storage):
         x, i0, i1, amt = inputs
-        if not self.inplace:
-            x = x.copy()
-        xview = get_diagonal_subtensor_view(x, i0, i1)
-        xview += amt
-        output_storage[0][0] = x
+        if self.inplace:
+            xview = get_diagonal_subtensor_view(x, i0, i1)
+            xview += amt
+            output_storage[0][0] = x
+            return
+        # Write `x + amt` over the stripe and only copy the two triangles
+        # outside of it, so that each element of `x` is read once.
+        i0 = int(i0)
+        i1 = int(i1)
+        out = np.empty_like(x)
+        np.add(
+            _diagonal_subtensor_view(x, i0, i1),
+            amt,
+            out=_diagonal_subtensor_view(out, i0, i1),
+        )
+        n = x.shape[i0]
+        Tf = x.shape[i1]
+        idx = [slice(None)] * x.ndim
+        for t in range(Tf):
+            idx[i1] = t
+            for rows in (slice(0, Tf - 1 - t), slice(n - t, n)):
+                idx[i0] = rows
+                out[tuple(idx)] = x[tuple(idx)]
+        output_storage[0][0] = out
 
     def grad(self, inputs, g_outputs):
         x, i0, i1, amt = inputs
@@ -180,8 +278,129 @@ class IncDiagonalSubtensor(Op):
 inc_diagonal_subtensor = IncDiagonalSubtensor(False)
 
 
+class DiagonalSubtensorSum(Op):
+    """
+    Sum a diagonal subtensor along its axis ``i1``.
+
+    This computes ``diagonal_subtensor(x, i0, i1).sum(axis=i1)`` in a single
+    pass over ``x``, without going through the strided view.
+
+    Parameters
+    ----------
+    i0
+        Non-negative axis index in x
+    i1
+        Non-negative axis index in x, the one that is summed out
+    t_pad
+        Number of zeros implicitly padded on both sides of axis ``i0``
+        before taking the diagonal.
+    acc_dtype
+        The dtype of the internal accumulator, like for `Sum`. It defaults
+        to the dtype of ``x``, which is also the output dtype.
+
+    """
+
+    __props__ = ("i0", "i1", "t_pad", "acc_dtype")
+
+    def __init__(self, i0, i1, t_pad=0, acc_dtype=None):
+        self.i0 = i0
+        self.i1 = i1
+        self.t_pad = t_pad
+        self.acc_dtype = acc_dtype
+
+    def make_node(self, x):
+        x = at.as_tensor_variable(x)
+        if min(self.i0, self.i1) < 0 or max(self.i0, self.i1) >= x.type.ndim:
+            raise ValueError("axis out of range", (self.i0, self.i1), x.type.ndim)
+        if self.i0 == self.i1:
+            raise ValueError("i0 and i1 must be different axes", self.i0)
+        type_shape = [1 if shape == 1 else None for shape in x.type.shape]
+        type_shape[self.i0] = None
+        del type_shape[self.i1]
+        out_type = at.TensorType(x.type.dtype, shape=type_shape)
+        return Apply(self, [x], [out_type()])
+
+    def perform(self, node, inputs, output_storage):
+        (x,) = inputs
+        i0, i1, t_pad = self.i0, self.i1, self.t_pad
+        Tf = x.shape[i1]
+        n_in = x.shape[i0]
+        if n_in + 2 * t_pad < Tf:
+            raise ValueError("diagonal is longer than axis i0 (plus padding)")
+        n_out = n_in + 2 * t_pad - Tf + 1
+        out_shape = list(x.shape)
+        out_shape[i0] = n_out
+        del out_shape[i1]
+        acc_dtype = self.acc_dtype or x.dtype
+
+        # Element `a` of the diagonal stripe along `i1 = t` is
+        # `x[a + Tf-1-t - t_pad, t]`, or zero when that is in the padding.
+        # Accumulating one slab per `t` keeps the inner loops of the adds
+        # contiguous; `np.einsum` or `.sum(axis=i1)` over the strided view
+        # walk the `i1` axis innermost and are not faster.
+        out = np.zeros(out_shape, dtype=acc_dtype)
+        idx = [slice(None)] * x.ndim
+        out_idx = [slice(None)] * len(out_shape)
+        out_i0 = i0 if i0 < i1 else i0 - 1
+        for t in range(Tf):
+            start = Tf - 1 - t - t_pad
+            a_lo = max(0, -start)
+            a_hi = min(n_out, n_in - start)
+            if a_hi <= a_lo:
+                continue
+            idx[i0] = slice(a_lo + start, a_hi + start)
+            idx[i1] = t
+            out_idx[out_i0] = slice(a_lo, a_hi)
+            out[tuple(out_idx)] += x[tuple(idx)]
+        output_storage[0][0] = out.astype(x.dtype, copy=False)
+
+    def infer_shape(self, fgraph, node, shapes):
+        (xshp,) = shapes
+        out_shape = list(xshp)
+        out_shape[self.i0] = xshp[self.i0] + 2 * self.t_pad - xshp[self.i1] + 1
+        del out_shape[self.i1]
+        return [tuple(out_shape)]
+
+    def grad(self, inputs, g_outputs):
+        (x,) = inputs
+        i0, i1, t_pad = self.i0, self.i1, self.t_pad
+        gz = at.expand_dims(g_outputs[0], i1)
+        if t_pad == 0:
+            return [inc_diagonal_subtensor(at.zeros_like(x), i0, i1, gz)]
+        # Take the gradient w.r.t. the padded input, then drop the padding
+        padded_shape = [x.shape[k] for k in range(x.ndim)]
+        padded_shape[i0] += 2 * t_pad
+        gx_padded = inc_diagonal_subtensor(
+            at.zeros(padded_shape, dtype=x.dtype), i0, i1, gz
+        )
+        idx = [slice(None)] * x.ndim
+        idx[i0] = slice(t_pad, t_pad + x.shape[i0])
+        return [gx_padded[tuple(idx)]]
+
+
+def _constant_axes(node):
+    """Return the non-negative ``(i0, i1)`` of a `DiagonalSubtensor` node.
+
+    Return ``None`` when they are not constants.
+
+    """
+    if isinstance(node.op, DiagonalSubtensorConst):
+        return node.op.i0, node.op.i1
+    x, i0, i1 = node.inputs
+    try:
+        i0 = int(get_scalar_constant_value(i0)) % x.type.ndim
+        i1 = int(get_scalar_constant_value(i1)) % x.type.ndim
+    except NotScalarConstantError:
+        return None
+    return i0, i1
+
+
 def conv3d(
-    signals, filters, signals_shape=None, filters_shape=None, border_mode="valid"
+    signals,
+    filters,
+    signals_shape=None,
+    filters_shape=None,
+    border_mode="valid",
 ):
     """
     Convolve spatio-temporal filters with a movie.
@@ -268,10 +487,16 @@ def conv3d(
         raise ValueError("invalid border mode", border_mode[1])
 
     # reshape the temporary output to restore its original size
+    # (the conv2d implementations allocate C-contiguous outputs, so this
+    # only splits axes and is a view)
     out_tmp = out_4d.reshape((Ns, Ts, Nf, Tf, Hout, Wout))
 
     # now sum out along the Tf to get the output
     # but we have to sum on a diagonal through the Tf and Ts submatrix.
+    # The Tf axis is deliberately left in front of (Hout, Wout): the sum is
+    # rewritten into DiagonalSubtensorSum, which accumulates whole contiguous
+    # (Hout, Wout) planes for each Tf index. Moving Tf last would only be a
+    # strided view of the conv2d output, or would cost an extra copy.
     if Tf == 1:
         # for Tf==1, no sum along Tf, the Ts-axis of the output is unchanged!
         out_5d = out_tmp.reshape((Ns, Ts, Nf, Hout, Wout))
@@ -288,29 +513,196 @@ def conv3d(
         else:
             raise ValueError("invalid border mode", border_mode[0])
 
-        if Tpad == 0:
+        if Tpad == 0 and isinstance(Tf, (int, np.integer)) and Ts == Tf:
+            # the diagonal stripe is a single anti-diagonal of the Ts x Tf
+            # submatrix, so the output has a single time step
+            out_5d = at.add(*[out_tmp[:, Tf - 1 - t, :, t] for t in range(Tf)])
+            out_5d = out_5d.dimshuffle(0, "x", 1, 2, 3)
+        elif Tpad == 0:
             out_5d = diagonal_subtensor(out_tmp, 1, 3).sum(axis=3)
         else:
             # pad out_tmp with zeros before summing over the diagonal
-            out_tmp_padded = at.zeros(
-                dtype=out_tmp.dtype, shape=(Ns, Ts + 2 * Tpad, Nf, Tf, Hout, Wout)
-            )
-            out_tmp_padded = pytensor.tensor.subtensor.set_subtensor(
-                out_tmp_padded[:, Tpad : (Ts + Tpad), :, :, :, :], out_tmp
+            zero_slab = at.zeros(
+                dtype=out_tmp.dtype, shape=(Ns, Tpad, Nf, Tf, Hout, Wout)
             )
+            out_tmp_padded = at.concatenate([zero_slab, out_tmp, zero_slab], axis=1)
             out_5d = diagonal_subtensor(out_tmp_padded, 1, 3).sum(axis=3)
 
     return out_5d
 
 
+@register_specialize
+@node_rewriter([Sum])
+def local_fuse_diagonal_sum(fgraph, node):
+    """Sum(DiagonalSubtensor(x, i0, i1), axis=i1) -> DiagonalSubtensorSum(x)."""
+    diag = node.inputs[0]
+    if not (diag.owner and isinstance(diag.owner.op, DiagonalSubtensor)):
+        return False
+    x = diag.owner.inputs[0]
+    axes = _constant_axes(diag.owner)
+    if axes is None:
+        return False
+    i0, i1 = axes
+    if node.op.axis != (i1,) or node.outputs[0].dtype != x.dtype:
+        return False
+    new_out = DiagonalSubtensorSum(i0, i1, acc_dtype=node.op.acc_dtype)(x)
+    copy_stack_trace(node.outputs[0], new_out)
+    return [new_out]
+
+
+def _same_dim(fgraph, x, y, k):
+    """Return ``True`` if `x` and `y` are known to have the same length on axis `k`."""
+    if x.type.shape[k] is not None and x.type.shape[k] == y.type.shape[k]:
+        return True
+    shape_feature = getattr(fgraph, "shape_feature", None)
+    return shape_feature is not None and shape_feature.same_shape(x, y, k, k)
+
+
+def _is_zeros(x):
+    try:
+        return get_scalar_constant_value(x) == 0
+    except NotScalarConstantError:
+        return False
+
+
+def _set_subtensor_padding(fgraph, padded, axis):
+    """Match ``set_subtensor(zeros[..., p:p + n, ...], x)`` padding `axis`.
+
+    Return ``(x, p)`` when the zeros pad `x` by ``p`` on both sides of
+    `axis`, and ``None`` otherwise.
+
+    """
+    zeros, x = padded.owner.inputs[:2]
+    if not padded.owner.op.set_instead_of_inc or not _is_zeros(zeros):
+        return None
+    if x.type.ndim != zeros.type.ndim or x.type.dtype != zeros.type.dtype:
+        return None
+    try:
+        idx_list = [
+            as_index_literal(idx)
+            for idx in indices_from_subtensor(
+                padded.owner.inputs[2:], padded.owner.op.idx_list
+            )
+        ]
+    except NotScalarConstantError:
+        return None
+
+    if axis >= len(idx_list):
+        return None
+    for k in range(x.type.ndim):
+        if k == axis:
+            continue
+        if k < len(idx_list) and idx_list[k] != slice(None):
+            return None
+        if not _same_dim(fgraph, x, zeros, k):
+            return None
+
+    pad_idx = idx_list[axis]
+    n_in = x.type.shape[axis]
+    n_padded = zeros.type.shape[axis]
+    if not isinstance(pad_idx, slice) or pad_idx.step not in (None, 1):
+        return None
+    if n_in is None or n_padded is None:
+        return None
+    t_pad = pad_idx.start or 0
+    stop = n_padded if pad_idx.stop is None else pad_idx.stop
+    if t_pad < 0 or stop - t_pad != n_in or n_padded != n_in + 2 * t_pad:
+        return None
+    return x, t_pad
+
+
+def _join_padding(fgraph, padded, axis):
+    """Match ``concatenate([zeros, x, zeros], axis)``.
+
+    Return ``(x, p)`` when both zero blocks have length ``p`` on `axis`, and
+    ``None`` otherwise.
+
+    """
+    join_axis, *parts = padded.owner.inputs
+    if len(parts) != 3:
+        return None
+    try:
+        join_axis = int(get_scalar_constant_value(join_axis))
+    except NotScalarConstantError:
+        return None
+    left, x, right = parts
+    if join_axis % x.type.ndim != axis:
+        return None
+    if not (_is_zeros(left) and _is_zeros(right)):
+        return None
+    if not (left.type.dtype == x.type.dtype == right.type.dtype):
+        return None
+    t_pad = left.type.shape[axis]
+    if t_pad is None or right.type.shape[axis] != t_pad:
+        return None
+    for k in range(x.type.ndim):
+        if k == axis:
+            continue
+        if not (_same_dim(fgraph, x, left, k) and _same_dim(fgraph, x, right, k)):
+            return None
+    return x, t_pad
+
+
+@register_specialize
+@node_rewriter([DiagonalSubtensorSum])
+def local_fuse_padded_diag_sum(fgraph, node):
+    """Absorb the zero-padding of the input of a `DiagonalSubtensorSum`.
+
+    DiagonalSubtensorSum(set_subtensor(zeros[..., p:p + n, ...], x))
+    -> DiagonalSubtensorSum(x, t_pad=p)
+
+    DiagonalSubtensorSum(concatenate([zeros, x, zeros], axis=i0))
+    -> DiagonalSubtensorSum(x, t_pad=p)
+
+    when the zeros pad axis ``i0`` of `x` by ``p`` on both sides.
+
+    """
+    padded = node.inputs[0]
+    if node.op.t_pad != 0 or padded.owner is None:
+        return False
+    if isinstance(padded.owner.op, IncSubtensor):
+        match = _set_subtensor_padding(fgraph, padded, node.op.i0)
+    elif isinstance(padded.owner.op, Join):
+        match = _join_padding(fgraph, padded, node.op.i0)
+    else:
+        return False
+    if match is None:
+        return False
+
+    x, t_pad = match
+    new_out = DiagonalSubtensorSum(
+        node.op.i0, node.op.i1, t_pad=t_pad, acc_dtype=node.op.acc_dtype
+    )(x)
+    copy_stack_trace(node.outputs[0], new_out)
+    return [new_out]
+
+
+@register_specialize
+@node_rewriter([DiagonalSubtensor])
+def local_specialize_DiagonalSubtensor(fgraph, node):
+    """DiagonalSubtensor(x, i0, i1) -> DiagonalSubtensorConst(i0, i1)(x)."""
+    if isinstance(node.op, DiagonalSubtensorConst):
+        return False
+    axes = _constant_axes(node)
+    if axes is None:
+        return False
+    new_op = DiagonalSubtensorConst(
+        *axes, inplace=node.op.inplace, strict=node.op.strict
+    )
+    new_out = new_op(node.inputs[0])
+    copy_stack_trace(node.outputs[0], new_out)
+    return [new_out]
+
+
 @node_rewriter([DiagonalSubtensor, IncDiagonalSubtensor])
 def local_inplace_DiagonalSubtensor(fgraph, node):
     """Also work for IncDiagonalSubtensor."""
     if (
         isinstance(node.op, (DiagonalSubtensor, IncDiagonalSubtensor))
         and not node.op.inplace
+        and not getattr(node.op, "strict", False)
     ):
-        new_op = node.op.__class__(inplace=True)
+        new_op = type(node.op)(**dict(node.op._props_dict(), inplace=True))
         new_node = new_op(*node.inputs)
         copy_stack_trace(node.outputs[0], new_node)
         return [new_node]
@@ -327,3 +719,11 @@ pytensor.compile.optdb.register(
     "inplace",
     position=60,
 )
+
+
+# The Numba and JAX implementations of the Ops above are registered when
+# their backend is loaded; if that already happened, register them now.
+for _backend in ("numba", "jax"):
+    _dispatch = sys.modules.get(f"pytensor.link.{_backend}.dispatch.nnet")
+    if _dispatch is not None:
+        _dispatch.register_conv3d2d()
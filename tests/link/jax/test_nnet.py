@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from pytensor.configdefaults import config
+from pytensor.graph.fg import FunctionGraph
+from pytensor.tensor.nnet.conv3d2d import DiagonalSubtensorSum, diagonal_subtensor
+from pytensor.tensor.type import tensor3
+from tests.link.jax.test_basic import compare_jax_and_py
+
+
+jax = pytest.importorskip("jax")
+
+
+@pytest.mark.parametrize("i0, i1", [(0, 1), (1, 2), (1, 0)])
+def test_jax_DiagonalSubtensor(i0, i1):
+    x = tensor3("x")
+    out = diagonal_subtensor(x, i0, i1)
+    fgraph = FunctionGraph([x], [out])
+
+    x_val = np.arange(5 * 5 * 3, dtype=config.floatX).reshape((5, 5, 3))
+    compare_jax_and_py(fgraph, [x_val], must_be_device_array=False)
+
+
+@pytest.mark.parametrize("t_pad", [0, 2])
+def test_jax_DiagonalSubtensorSum(t_pad):
+    x = tensor3("x")
+    out = DiagonalSubtensorSum(0, 1, t_pad)(x)
+    fgraph = FunctionGraph([x], [out])
+
+    rng = np.random.default_rng(2392)
+    x_val = rng.random((5, 3, 2)).astype(config.floatX)
+    compare_jax_and_py(fgraph, [x_val], must_be_device_array=False)
@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import pytensor
+from pytensor.configdefaults import config
+from pytensor.graph.fg import FunctionGraph
+from pytensor.tensor.nnet.conv3d2d import (
+    DiagonalSubtensor,
+    DiagonalSubtensorSum,
+    diagonal_subtensor,
+)
+from pytensor.tensor.type import tensor3
+from tests.link.numba.test_basic import compare_numba_and_py
+
+
+rng = np.random.default_rng(2392)
+
+
+@pytest.mark.parametrize("strict", [False, True])
+@pytest.mark.parametrize("i0, i1", [(0, 1), (1, 2), (1, 0)])
+def test_DiagonalSubtensor(i0, i1, strict):
+    x = tensor3("x")
+    if strict:
+        out = DiagonalSubtensor(strict=True)(x, i0, i1)
+    else:
+        out = diagonal_subtensor(x, i0, i1)
+    fgraph = FunctionGraph([x], [out])
+
+    x_val = rng.random((5, 5, 3)).astype(config.floatX)
+    compare_numba_and_py(fgraph, [x_val])
+
+
+@pytest.mark.parametrize("t_pad", [0, 2])
+def test_DiagonalSubtensorSum(t_pad):
+    x = tensor3("x")
+    out = DiagonalSubtensorSum(0, 1, t_pad)(x)
+    fgraph = FunctionGraph([x], [out])
+
+    x_val = rng.random((5, 3, 2)).astype(config.floatX)
+    compare_numba_and_py(fgraph, [x_val])
+
+
+diagonal_subtensor_sum_cache_code = """
+import numpy as np
+
+import pytensor
+from pytensor.tensor.nnet.conv3d2d import DiagonalSubtensorSum
+from pytensor.tensor.type import dtensor3
+
+x = dtensor3("x")
+fn = pytensor.function([x], DiagonalSubtensorSum(0, 1, 1)(x), mode="NUMBA")
+print(fn(np.ones((5, 3, 2))).sum())
+"""
+
+
+def test_DiagonalSubtensorSum_cached(tmp_path):
+    """Make sure a function loaded from the Numba cache can be run."""
+    env = dict(
+        os.environ,
+        NUMBA_CACHE_DIR=str(tmp_path / "numba_cache"),
+        PYTENSOR_FLAGS="numba__cache=True",
+    )
+    # The second run loads the kernels compiled by the first one
+    for _ in range(2):
+        p = subprocess.run(
+            [sys.executable, "-c", diagonal_subtensor_sum_cache_code],
+            cwd=Path(pytensor.__file__).parents[1],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=env,
+        )
+        assert p.returncode == 0, p.stdout.decode()
+        assert p.stdout.decode().split()[-1] == "26.0"
@@ -0,0 +1,98 @@
+import warnings
+
+import numpy as np
+import pytest
+
+import pytensor
+from pytensor.sandbox import fourier
+from pytensor.tensor.type import dmatrix, fmatrix
+
+
+scipy_fft = pytest.importorskip("scipy.fft")
+
+with warnings.catch_warnings():
+    # The module warns about its upcoming deprecation when its Ops are used.
+    warnings.simplefilter("ignore")
+    from pytensor.sandbox.fourier import FFT, dct_matrix, fft, half_fft
+
+
+def test_deprecated_names():
+    assert "fft" not in vars(fourier)
+    with pytest.warns(DeprecationWarning, match="pytensor.tensor.fft"):
+        assert fourier.fft is fft
+    with pytest.raises(AttributeError):
+        fourier.rfft
+
+
+@pytest.mark.parametrize("n", (1, 4, 7))
+def test_dct_matrix_unitary(n):
+    rval = dct_matrix(n, n)
+    expected = scipy_fft.dct(np.eye(n), norm="ortho", axis=0)
+    np.testing.assert_allclose(rval, expected, atol=1e-12)
+
+
+def test_dct_matrix_rows():
+    full = dct_matrix(8, 8, unitary=False)
+    part = dct_matrix(3, 8, unitary=False)
+    assert part.shape == (3, 8)
+    np.testing.assert_allclose(part, full[:3])
+    np.testing.assert_allclose(full[0], np.sqrt(2.0 / 8))
+
+
+def test_dct_matrix_cached_copy():
+    a = dct_matrix(4, 5)
+    a[0] = 0
+    b = dct_matrix(4, 5)
+    assert b.flags.writeable
+    assert not np.shares_memory(a, b)
+    np.testing.assert_allclose(b[0], np.sqrt(0.5) * np.sqrt(2.0 / 5))
+
+
+@pytest.fixture(params=("pyfftw", "scipy", "numpy"))
+def fft_backend(request, monkeypatch):
+    if request.param == "pyfftw":
+        if fourier.pyfftw_fft is None:
+            pytest.skip("pyFFTW is not installed")
+    else:
+        monkeypatch.setattr(fourier, "pyfftw_fft", None)
+        if request.param == "numpy":
+            monkeypatch.setattr(fourier, "scipy_fft", None)
+    return request.param
+
+
+@pytest.mark.parametrize("axis", (0, 1))
+@pytest.mark.parametrize("inverse", (False, True))
+@pytest.mark.parametrize("half", (False, True))
+def test_fft(fft_backend, half, inverse, axis):
+    x = dmatrix()
+    n = 8
+    f = pytensor.function([x], FFT(half=half, inverse=inverse)(x, n, axis))
+
+    rng = np.random.default_rng(1234)
+    x_val = rng.random((6, 10))
+    if inverse:
+        expected = np.fft.ifft(x_val, n, axis)
+    else:
+        expected = np.fft.fft(x_val, n, axis)
+    if half:
+        expected = expected[: n // 2] if axis == 0 else expected[:, : n // 2]
+
+    res = f(x_val)
+    assert res.dtype == "complex128"
+    np.testing.assert_allclose(res, expected, atol=1e-10)
+
+
+def test_fft_float32(fft_backend):
+    x = fmatrix()
+    f = pytensor.function([x], half_fft(x, 4, 1))
+    x_val = np.arange(12, dtype="float32").reshape(3, 4)
+    res = f(x_val)
+    assert res.dtype == "complex128"
+    np.testing.assert_allclose(res, np.fft.fft(x_val, 4, 1)[:, :2], atol=1e-10)
+
+
+def test_half_fft_odd_length():
+    x = dmatrix()
+    f = pytensor.function([x], half_fft(x, 5, 1))
+    with pytest.raises(ValueError, match="odd-length"):
+        f(np.ones((2, 5)))
@@ -5,19 +5,27 @@ import pytensor
 
 
 try:
-    from scipy import ndimage
+    from scipy import signal
 except ImportError:
-    ndimage = None
+    signal = None
 
 import tests.unittest_tools as utt
 from pytensor.compile.sharedvalue import shared
 from pytensor.graph.rewriting.basic import check_stack_trace
+from pytensor.tensor.basic import Join, concatenate
+from pytensor.tensor.basic import zeros as at_zeros
 from pytensor.tensor.nnet.conv3d2d import (
     DiagonalSubtensor,
+    DiagonalSubtensorConst,
+    DiagonalSubtensorSum,
     IncDiagonalSubtensor,
     conv3d,
+    diagonal_subtensor,
     get_diagonal_subtensor_view,
 )
+from pytensor.tensor.shape import specify_shape
+from pytensor.tensor.subtensor import IncSubtensor, set_subtensor
+from pytensor.tensor.type import tensor3
 
 
 def test_get_diagonal_subtensor_view(wrap=lambda a: a):
@@ -54,6 +62,190 @@ def test_get_diagonal_subtensor_view(wrap=lambda a: a):
     for xi, xvi in zip(x, xv12):
         assert np.array_equal(xvi, get_diagonal_subtensor_view(xi, 0, 1))
 
+    # a single column is its own diagonal
+    x = np.arange(8).reshape(4, 1, 2)
+    xv01 = get_diagonal_subtensor_view(x, 0, 1)
+    assert np.array_equal(xv01, x)
+    assert np.shares_memory(xv01, x)
+
+
+@pytest.mark.parametrize("i0, i1", [(0, 1), (0, 2), (1, 2), (-3, -1)])
+@pytest.mark.parametrize("contiguous", (True, False))
+def test_inc_diagonal_subtensor_perform(i0, i1, contiguous):
+    rng = np.random.default_rng(utt.fetch_seed())
+    x_val = rng.random((5, 4, 3)) if contiguous else rng.random((3, 4, 5)).T
+    amt_val = rng.random(get_diagonal_subtensor_view(x_val, i0, i1).shape)
+
+    expected = x_val.copy()
+    get_diagonal_subtensor_view(expected, i0, i1)[...] += amt_val
+
+    x = tensor3(dtype="float64")
+    amt = tensor3(dtype="float64")
+    node = IncDiagonalSubtensor(False).make_node(x, i0, i1, amt)
+    out_storage = [[None]]
+    x_copy = x_val.copy()
+    node.op.perform(node, [x_val, np.asarray(i0), np.asarray(i1), amt_val], out_storage)
+    utt.assert_allclose(out_storage[0][0], expected)
+    assert np.array_equal(x_val, x_copy)
+
+
+def test_diagonal_subtensor_view_map():
+    x = np.arange(24, dtype="float64").reshape(4, 3, 2)
+    expected = get_diagonal_subtensor_view(x, 0, 1)
+
+    for op, is_view in (
+        (DiagonalSubtensor(), True),
+        (DiagonalSubtensor(inplace=True), True),
+        (DiagonalSubtensor(strict=True), False),
+    ):
+        assert (op.view_map == {0: [0]}) == is_view
+        out = [None]
+        op.perform(None, [x, 0, 1], [out])
+        assert np.array_equal(out[0], expected)
+        assert np.shares_memory(out[0], x) == is_view
+
+
+def pad_axis(x, axis, t_pad):
+    pad_width = [(0, 0)] * x.ndim
+    pad_width[axis] = (t_pad, t_pad)
+    return np.pad(x, pad_width)
+
+
+@pytest.mark.parametrize("t_pad", (0, 2))
+@pytest.mark.parametrize("i0, i1", ((0, 1), (0, 2), (1, 2), (1, 0)))
+def test_diagonal_subtensor_sum(i0, i1, t_pad):
+    rng = np.random.default_rng(utt.fetch_seed())
+    x_val = rng.random((5, 5, 3)).astype(pytensor.config.floatX)
+    x_padded = pad_axis(x_val, i0, t_pad)
+    expected = get_diagonal_subtensor_view(x_padded, i0, i1).sum(axis=i1)
+
+    x = tensor3()
+    out = DiagonalSubtensorSum(i0, i1, t_pad=t_pad)(x)
+    f = pytensor.function([x], out)
+    utt.assert_allclose(f(x_val), expected)
+    assert tuple(pytensor.function([x], out.shape)(x_val)) == expected.shape
+
+    utt.verify_grad(
+        DiagonalSubtensorSum(i0, i1, t_pad=t_pad), [x_val.astype("float64")]
+    )
+
+
+@pytest.mark.parametrize("t_pad", (0, 2))
+@pytest.mark.parametrize("contiguous", (True, False))
+def test_diagonal_subtensor_sum_perform(contiguous, t_pad):
+    rng = np.random.default_rng(utt.fetch_seed())
+    x = rng.random((2, 7, 3, 4, 5, 6)).astype("float32")
+    if not contiguous:
+        x = x[..., ::-1]
+    x_padded = pad_axis(x, 1, t_pad)
+    expected = get_diagonal_subtensor_view(x_padded, 1, 3).sum(axis=3)
+
+    op = DiagonalSubtensorSum(1, 3, t_pad=t_pad)
+    node = op.make_node(x)
+    out = [None]
+    op.perform(node, [x], [out])
+    utt.assert_allclose(out[0], expected)
+
+
+def test_local_fuse_diagonal_sum():
+    mode = pytensor.compile.mode.get_mode("FAST_RUN")
+    x = tensor3()
+    f = pytensor.function([x], diagonal_subtensor(x, 0, 1).sum(axis=1), mode=mode)
+    ops = [node.op for node in f.maker.fgraph.toposort()]
+    assert any(isinstance(op, DiagonalSubtensorSum) for op in ops)
+    assert not any(isinstance(op, DiagonalSubtensor) for op in ops)
+
+    # Summing over another axis is not a diagonal sum
+    f = pytensor.function([x], diagonal_subtensor(x, 0, 1).sum(axis=2), mode=mode)
+    ops = [node.op for node in f.maker.fgraph.toposort()]
+    assert not any(isinstance(op, DiagonalSubtensorSum) for op in ops)
+
+    # The accumulator dtype of the `Sum` is kept
+    x = tensor3(dtype="float32")
+    f = pytensor.function([x], diagonal_subtensor(x, 0, 1).sum(axis=1), mode=mode)
+    (op,) = [
+        node.op
+        for node in f.maker.fgraph.toposort()
+        if isinstance(node.op, DiagonalSubtensorSum)
+    ]
+    assert op.acc_dtype == "float64"
+
+
+def test_diagonal_subtensor_sum_errors():
+    x = tensor3()
+    with pytest.raises(ValueError, match="axis out of range"):
+        DiagonalSubtensorSum(-2, 1)(x)
+    with pytest.raises(ValueError, match="axis out of range"):
+        DiagonalSubtensorSum(0, 3)(x)
+    with pytest.raises(ValueError, match="different axes"):
+        DiagonalSubtensorSum(1, 1)(x)
+
+    op = DiagonalSubtensorSum(0, 1, t_pad=1)
+    x_val = np.zeros((2, 5, 3), dtype=x.dtype)
+    with pytest.raises(ValueError, match="diagonal is longer"):
+        op.perform(op.make_node(x), [x_val], [[None]])
+
+
+def test_diagonal_subtensor_sum_acc_dtype():
+    x_val = np.full((300, 200), 0.1, dtype="float16")
+    expected = get_diagonal_subtensor_view(x_val.astype("float32"), 0, 1).sum(axis=1)
+
+    op = DiagonalSubtensorSum(0, 1, acc_dtype="float32")
+    node = op.make_node(x_val)
+    out = [None]
+    op.perform(node, [x_val], [out])
+    assert out[0].dtype == "float16"
+    np.testing.assert_array_equal(out[0], expected.astype("float16"))
+
+
+def test_local_specialize_DiagonalSubtensor():
+    mode = pytensor.compile.mode.get_mode("FAST_RUN")
+    x = tensor3()
+    x_val = np.random.default_rng(utt.fetch_seed()).random((5, 5, 3))
+    x_val = x_val.astype(x.dtype)
+    f = pytensor.function([x], diagonal_subtensor(x, 1, -3) * 2, mode=mode)
+    ops = [node.op for node in f.maker.fgraph.toposort()]
+    assert any(
+        isinstance(op, DiagonalSubtensorConst) and (op.i0, op.i1) == (1, 0)
+        for op in ops
+    )
+    expected = get_diagonal_subtensor_view(x_val, 1, 0) * 2
+    utt.assert_allclose(f(x_val), expected)
+
+    utt.verify_grad(DiagonalSubtensorConst(0, 1), [x_val])
+
+
+def test_local_fuse_padded_diag_sum():
+    mode = pytensor.compile.mode.get_mode("FAST_RUN")
+    x = tensor3()
+    x_val = np.random.default_rng(utt.fetch_seed()).random((5, 3, 2))
+    x_val = x_val.astype(x.dtype)
+    x_fixed = specify_shape(x, x_val.shape)
+
+    padded = at_zeros((9, 3, 2), dtype=x.dtype)
+    padded = set_subtensor(padded[2:7], x_fixed)
+    f = pytensor.function([x], diagonal_subtensor(padded, 0, 1).sum(axis=1), mode=mode)
+    ops = [node.op for node in f.maker.fgraph.toposort()]
+    assert any(isinstance(op, DiagonalSubtensorSum) and op.t_pad == 2 for op in ops)
+    assert not any(isinstance(op, IncSubtensor) for op in ops)
+    expected = get_diagonal_subtensor_view(pad_axis(x_val, 0, 2), 0, 1).sum(axis=1)
+    utt.assert_allclose(f(x_val), expected)
+
+    zero_slab = at_zeros((2, 3, 2), dtype=x.dtype)
+    padded = concatenate([zero_slab, x_fixed, zero_slab], axis=0)
+    f = pytensor.function([x], diagonal_subtensor(padded, 0, 1).sum(axis=1), mode=mode)
+    ops = [node.op for node in f.maker.fgraph.toposort()]
+    assert any(isinstance(op, DiagonalSubtensorSum) and op.t_pad == 2 for op in ops)
+    assert not any(isinstance(op, Join) for op in ops)
+    utt.assert_allclose(f(x_val), expected)
+
+    # Asymmetric padding can't be absorbed
+    padded = at_zeros((9, 3, 2), dtype=x.dtype)
+    padded = set_subtensor(padded[1:6], x_fixed)
+    f = pytensor.function([x], diagonal_subtensor(padded, 0, 1).sum(axis=1), mode=mode)
+    ops = [node.op for node in f.maker.fgraph.toposort()]
+    assert any(isinstance(op, IncSubtensor) for op in ops)
+
 
 def pyconv3d(signals, filters, border_mode="valid"):
     Ns, Ts, C, Hs, Ws = signals.shape
@@ -84,30 +276,26 @@ def pyconv3d(signals, filters, border_mode="valid"):
         Ns, Ts, C, Hs, Ws = signals_padded.shape
         signals = signals_padded
 
-    Tf2 = Tf // 2
-    Hf2 = Hf // 2
-    Wf2 = Wf // 2
-
-    rval = np.zeros((Ns, Ts - Tf + 1, Nf, Hs - Hf + 1, Ws - Wf + 1))
-    for ns in range(Ns):
-        for nf in range(Nf):
-            for c in range(C):
-                s_i = signals[ns, :, c, :, :]
-                f_i = filters[nf, :, c, :, :]
-                r_i = rval[ns, :, nf, :, :]
-                o_i = ndimage.convolve(s_i, f_i, mode="constant", cval=1)
-                o_i_sh0 = o_i.shape[0]
-                # print s_i.shape, f_i.shape, r_i.shape, o_i.shape
-                r_i += o_i[Tf2 : o_i_sh0 - Tf2, Hf2:-Hf2, Wf2:-Wf2]
+    # Convolve every (signal, filter) pair over (T, H, W) at once and
+    # sum over the input channels.
+    rval = signal.fftconvolve(
+        signals[:, None].astype("float64"),
+        filters[None].astype("float64"),
+        mode="valid",
+        axes=(2, 4, 5),
+    ).sum(axis=3)
+    rval = rval.transpose(0, 2, 1, 3, 4)
     return rval
 
 
 def check_diagonal_subtensor_view_traces(fn):
-    assert check_stack_trace(fn, ops_to_check=(DiagonalSubtensor, IncDiagonalSubtensor))
+    assert check_stack_trace(
+        fn, ops_to_check=(DiagonalSubtensor, DiagonalSubtensorSum, IncDiagonalSubtensor)
+    )
 
 
 @pytest.mark.skipif(
-    ndimage is None or not pytensor.config.cxx,
+    signal is None or not pytensor.config.cxx,
     reason="conv3d2d tests need SciPy and a c++ compiler",
 )
 @pytest.mark.parametrize("border_mode", ("valid", "full", "half"))
@@ -235,3 +423,48 @@ def test_conv3d(border_mode):
         eps=1e-1,
         mode=mode,
     )
+
+
+@pytest.mark.skipif(
+    signal is None or not pytensor.config.cxx,
+    reason="conv3d2d tests need SciPy and a c++ compiler",
+)
+def test_conv3d_single_time_step():
+    if pytensor.config.mode == "FAST_COMPILE":
+        mode = pytensor.compile.mode.get_mode("FAST_RUN")
+    else:
+        mode = pytensor.compile.mode.get_default_mode()
+
+    # With Ts == Tf and no temporal padding, no diagonal sum is needed
+    Ns, Ts, C, Hs, Ws = 2, 3, 2, 6, 6
+    Nf, Tf, C, Hf, Wf = 3, 3, 2, 3, 3
+
+    rng = np.random.default_rng(utt.fetch_seed())
+    signals = rng.random((Ns, Ts, C, Hs, Ws)).astype("float32")
+    filters = rng.random((Nf, Tf, C, Hf, Wf)).astype("float32")
+
+    s_signals = shared(signals)
+    s_filters = shared(filters)
+    out = conv3d(
+        s_signals,
+        s_filters,
+        signals_shape=signals.shape,
+        filters_shape=filters.shape,
+    )
+    f = pytensor.function([], out, mode=mode)
+    assert not any(
+        isinstance(node.op, (DiagonalSubtensor, DiagonalSubtensorSum))
+        for node in f.maker.fgraph.toposort()
+    )
+    res = f()
+    assert res.shape == (Ns, 1, Nf, Hs - Hf + 1, Ws - Wf + 1)
+    utt.assert_allclose(pyconv3d(signals, filters), res)
+
+    utt.verify_grad(
+        lambda s, f: conv3d(
+            s, f, signals_shape=signals.shape, filters_shape=filters.shape
+        ),
+        [signals, filters],
+        eps=1e-1,
+        mode=mode,
+    )